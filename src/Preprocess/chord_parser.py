@@ -2,9 +2,36 @@
 Chord Parsing and Harmony Processing
 """
 
+import numpy as np
 import pandas as pd
-from typing import Optional, Tuple, Dict
-from .config import NOTE_NAMES, NOTE_NAMES_SHARP, CHORD_QUALITY_MAP
+from functools import lru_cache
+from typing import Optional, Tuple, Dict, Iterable, Sequence
+from .config import CHORD_QUALITY_MAP, ROOT_TO_PC, QUALITY_TO_IDX
+
+
+@lru_cache(maxsize=4096)
+def _parse_chord(chord_symbol: str) -> Optional[Tuple[int, int]]:
+    """Cached implementation of ChordParser.parse_chord."""
+    if not ChordParser._is_valid_chord(chord_symbol):
+        return None
+    
+    chord_symbol = chord_symbol.strip()
+    
+    if len(chord_symbol) >= 2 and chord_symbol[1] in ['#', 'b']:
+        root = chord_symbol[:2]
+        quality = chord_symbol[2:]
+    else:
+        root = chord_symbol[:1]
+        quality = chord_symbol[1:]
+    
+    # Convert root to pitch class (0 as default)
+    root_idx = ROOT_TO_PC.get(root, 0)
+
+    # Convert quality to quality index (major as default)
+    quality_idx = QUALITY_TO_IDX.get(quality, 0)
+
+    return root_idx, quality_idx
+
 
 class ChordParser:
     """Parser for jazz chord symbols."""
@@ -23,10 +50,11 @@ class ChordParser:
         return chord_symbol != 'NC' and chord_symbol != ''
 
     @staticmethod
-    def parse_chord(chord_symbol: str) -> Optional[Dict[str, int]]:
+    def parse_chord(chord_symbol: str) -> Optional[Tuple[int, int]]:
         """
         Extract chord root and quality from chord symbol.
         Then convert to pitch class (0-11) and quality index (0-3).
+        Results are cached, since the chord vocabulary is small.
 
         Quality mapping:
         0: Maj
@@ -38,44 +66,38 @@ class ChordParser:
             chord_symbol (str): Chord symbol (e.g., 'Ebj7', 'F-7', 'Gm7b5', 'F', 'Bb7913')
 
         Returns:
-            Optional[int, int]: Pitch class of the chord root and quality index (0-3)
+            Optional[Tuple[int, int]]: Pitch class of the chord root and quality index (0-3)
+        """
+        return _parse_chord(chord_symbol)
+
+    @classmethod
+    def build_lookup(cls, chord_symbols: Iterable[str]) -> Dict[str, Optional[Tuple[int, int]]]:
+        """
+        Parse each distinct chord symbol once and build a lookup table.
+
+        Args:
+            chord_symbols (Iterable[str]): Chord symbols, duplicates allowed
+
+        Returns:
+            Dict[str, Optional[Tuple[int, int]]]: (root, quality) for each symbol, None if invalid
+        """
+        return {chord_symbol: cls.parse_chord(chord_symbol) for chord_symbol in set(chord_symbols)}
+
+    @classmethod
+    def build_lookup_arrays(cls, chord_symbols: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Build dense root and quality arrays aligned with the given chord symbols,
+        so parsed values can be gathered by chord id (position in chord_symbols).
+
+        Args:
+            chord_symbols (Sequence[str]): Distinct chord symbols
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: float64 roots and qualities, NaN for invalid chords
         """
-        if not ChordParser._is_valid_chord(chord_symbol):
-            return None
-        
-        chord_symbol = chord_symbol.strip()
-        
-        if len(chord_symbol) >= 2 and chord_symbol[1] in ['#', 'b']:
-            root = chord_symbol[:2]
-            quality = chord_symbol[2:]
-        else:
-            root = chord_symbol[:1]
-            quality = chord_symbol[1:]
-        
-        # Convert root to pitch class (initialize to 0 as default)
-        root_idx = 0
-        try:
-            if root in NOTE_NAMES:
-                root_idx = NOTE_NAMES.index(root)
-            elif root in NOTE_NAMES_SHARP:
-                root_idx = NOTE_NAMES_SHARP.index(root)
-        except:
-            pass
-
-        # Convert quality to quality index (major as default)
-        quality_idx = 0
-        try:
-            for idx, key in enumerate(CHORD_QUALITY_MAP):
-                if quality in CHORD_QUALITY_MAP[key]:
-                    quality_idx = idx
-                    break
-        except:
-            pass
-
-        return {
-            'root': int(root_idx),
-            'quality': int(quality_idx)
-        }
+        parsed = [cls.parse_chord(chord_symbol) or (np.nan, np.nan) for chord_symbol in chord_symbols]
+        lookup = np.array(parsed, dtype=np.float64).reshape(-1, 2)
+        return lookup[:, 0], lookup[:, 1]
 
     @staticmethod
     def calculate_secondary_dominant(target_root: int) -> Tuple[int, int]:
@@ -12,7 +12,7 @@ from pathlib import Path
 DB_PATH = 'data/wjazzd.db'
 
 # Output paths
-OUTPUT_PKL = 'data/wjd_bebop_preprocessed.pkl'
+OUTPUT_PARQUET = 'data/wjd_bebop_preprocessed.parquet'
 OUTPUT_CSV = 'data/wjd_bebop_preprocessed.csv'
 
 
@@ -32,6 +32,9 @@ TARGET_SIGNATURE = '4/4'
 NOTE_NAMES = ['C', 'Db', 'D', 'Eb', 'E', 'F', 'Gb', 'G', 'Ab', 'A', 'Bb', 'B']
 NOTE_NAMES_SHARP = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
 
+# Note name (flat or sharp spelling) -> pitch class (0-11)
+ROOT_TO_PC = {**{n: i for i, n in enumerate(NOTE_NAMES)}, **{n: i for i, n in enumerate(NOTE_NAMES_SHARP)}}
+
 # ============================================================================
 # RHYTHM GRID CONSTANTS
 # ============================================================================
@@ -49,3 +52,6 @@ CHORD_QUALITY_MAP = {
     'dom': ['7', '79b', '7913'],
     'half-dim': ['m7b5'],
 }
+
+# Chord quality symbol -> quality index (0-3)
+QUALITY_TO_IDX = {q: i for i, (_, qs) in enumerate(CHORD_QUALITY_MAP.items()) for q in qs}
@@ -5,10 +5,18 @@ Handles SQLite database operations, data loading, and chord alignment.
 """
 
 import sqlite3
+from pathlib import Path
 import pandas as pd
-from typing import List, Dict
+from typing import List, Dict, Sequence, Any, Tuple
 from .config import TARGET_MELODY_TYPE, TARGET_STYLES, TARGET_SIGNATURE, NOTE_NAMES
 
+# connectorx copies query results straight into column buffers, which is much
+# faster than building Python tuples through sqlite3. Fall back if unavailable.
+try:
+    import connectorx as cx
+except ImportError:
+    cx = None
+
 class WJD:
     """Manager class for WJDDatabase"""
 
@@ -21,17 +29,46 @@ class WJD:
         """
         self.db_path = db_path
 
-    def get_target_melids(self) -> List[int]:
+        # Single connection reused for all queries
+        self._conn = sqlite3.connect(db_path)
+        self._conn.execute("PRAGMA cache_size = -200000")
+        self._conn.execute("PRAGMA temp_store = MEMORY")
+
+    def close(self):
+        """Close the database connection."""
+        self._conn.close()
+
+    def _read_sql(self, query: str, params: Sequence[Any] = ()) -> pd.DataFrame:
         """
-        Extract melids that satisfies the following conditions:
-        - melody_type.type: {TARGET_MELODY_TYPE}
-        - solo_info.style: {TARGET_STYLES}
-        - beats.signature: {TARGET_SIGNATURE}
+        Run a query and return the result as a DataFrame.
+
+        Uses connectorx when installed, otherwise pandas over the sqlite3 connection.
+
+        Args:
+            query (str): SQL query with '?' placeholders
+            params (Sequence[Any]): Values for the placeholders
 
         Returns:
-            List[int]: List of melids
+            pd.DataFrame: Query result
+        """
+        if cx is None:
+            return pd.read_sql_query(query, self._conn, params=params)
+
+        # connectorx does not bind parameters, so inline them as literals
+        # (all values come from config or the database itself)
+        for param in params:
+            literal = "'" + param.replace("'", "''") + "'" if isinstance(param, str) else str(int(param))
+            query = query.replace('?', literal, 1)
+
+        return cx.read_sql(f"sqlite://{Path(self.db_path).resolve()}", query, return_type="pandas")
+
+    def _target_melids_query(self) -> Tuple[str, Tuple[Any, ...]]:
+        """
+        Build the query selecting target melids, usable as a subquery.
+
+        Returns:
+            Tuple[str, Tuple[Any, ...]]: SQL query and its parameters
         """
-        conn = sqlite3.connect('data/wjazzd.db')
         query = """
                 SELECT DISTINCT m.melid
                 FROM melody_type m
@@ -40,14 +77,22 @@ class WJD:
                 WHERE m.type = ?
                 AND s.style IN (?, ?)
                 AND b.signature = ?
-                ORDER BY m.melid
         """
-        df = pd.read_sql_query(
-            query, 
-            conn,
-            params=(TARGET_MELODY_TYPE, TARGET_STYLES[0], TARGET_STYLES[1], TARGET_SIGNATURE)
-        )
-        conn.close()
+        params = (TARGET_MELODY_TYPE, TARGET_STYLES[0], TARGET_STYLES[1], TARGET_SIGNATURE)
+        return query, params
+
+    def get_target_melids(self) -> List[int]:
+        """
+        Extract melids that satisfies the following conditions:
+        - melody_type.type: {TARGET_MELODY_TYPE}
+        - solo_info.style: {TARGET_STYLES}
+        - beats.signature: {TARGET_SIGNATURE}
+
+        Returns:
+            List[int]: List of melids
+        """
+        query, params = self._target_melids_query()
+        df = self._read_sql(query + "ORDER BY m.melid", params=params)
 
         return df['melid'].tolist()
 
@@ -59,37 +104,69 @@ class WJD:
             melid (int): ID of the solo
 
         Returns:
-            pd.DataFrame: Dataframe containing the solo data
+            Dict[str, pd.DataFrame]: melody, beats, and solo_info DataFrames of the solo
+        """
+        return self.load_solos([melid])
+
+    def load_solos(self, melids: List[int]) -> Dict[str, pd.DataFrame]:
+        """
+        Load data for multiple solos with one query per table
+
+        Args:
+            melids (List[int]): IDs of the solos
+
+        Returns:
+            Dict[str, pd.DataFrame]: melody, beats, and solo_info DataFrames, each with a melid column
         """
-        conn = sqlite3.connect(self.db_path)
+        placeholders = ', '.join('?' * len(melids))
+        return self._load_tables(placeholders, tuple(melids))
 
+    def load_all_solos(self) -> Dict[str, pd.DataFrame]:
+        """
+        Load data for all target solos (see get_target_melids) with one query per table.
+        The target conditions are applied as a subquery, so no melid list is needed.
+
+        Returns:
+            Dict[str, pd.DataFrame]: melody, beats, and solo_info DataFrames, each with a melid column
+        """
+        return self._load_tables(*self._target_melids_query())
+
+    def _load_tables(self, melid_filter: str, params: Tuple[Any, ...]) -> Dict[str, pd.DataFrame]:
+        """
+        Load melody, beats, and solo_info rows whose melid is IN (melid_filter)
+
+        Args:
+            melid_filter (str): Placeholder list or subquery selecting melids
+            params (Tuple[Any, ...]): Parameters of melid_filter
+
+        Returns:
+            Dict[str, pd.DataFrame]: melody, beats, and solo_info DataFrames, each with a melid column
+        """
         # Load melody events
-        melody_query = """
+        melody_query = f"""
         SELECT eventid, melid, pitch, onset, duration, bar, beat, tatum, division, beatdur
         FROM melody
-        WHERE melid = ?
-        ORDER by eventid
+        WHERE melid IN ({melid_filter})
+        ORDER by melid, eventid
         """
-        melody_df = pd.read_sql_query(melody_query, conn, params=(melid,))
+        melody_df = self._read_sql(melody_query, params=params)
 
         # Load beats events
-        beats_query = """
+        beats_query = f"""
         SELECT beatid, melid, bar, beat, chord, signature, chorus_id 
         FROM beats
-        WHERE melid = ?
-        ORDER by bar, beat
+        WHERE melid IN ({melid_filter})
+        ORDER by melid, bar, beat
         """
-        beats_df = pd.read_sql_query(beats_query, conn, params=(melid,))
+        beats_df = self._read_sql(beats_query, params=params)
 
         # Load solo_info events
-        solo_info_query = """
+        solo_info_query = f"""
         SELECT melid, key, avgtempo, performer, style, title 
         FROM solo_info
-        WHERE melid = ?
+        WHERE melid IN ({melid_filter})
         """
-        solo_info_df = pd.read_sql_query(solo_info_query, conn, params=(melid,))
-
-        conn.close()
+        solo_info_df = self._read_sql(solo_info_query, params=params)
 
         return {
             'melody': melody_df,
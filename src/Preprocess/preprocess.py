@@ -1,13 +1,14 @@
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict
 
 import sqlite3
+import numpy as np
 import pandas as pd
 
-from .config import DB_PATH, OUTPUT_PKL, OUTPUT_CSV, GRID_PER_BEAT, GRID_PER_BAR, NOTE_NAMES
+from .config import DB_PATH, OUTPUT_PARQUET, OUTPUT_CSV, GRID_PER_BEAT, GRID_PER_BAR, NOTE_NAMES
 from .data_loader import WJD
 from .chord_parser import ChordParser
-from .utils import safe_int, safe_divide, clip_to_range
 
 
 class Preprocessor:
@@ -19,88 +20,69 @@ class Preprocessor:
         """
         Main preprocessing pipeline.
 
-        Args:
-            db_path (str): Path to the database file
+        All target solos are loaded at once and every step runs over the whole
+        dataset; steps that depend on solo boundaries group by melid.
+
+        Returns:
+            pd.DataFrame: Processed data of all target solos
         """
 
         db = WJD(self.db_path)
         
-        # Step 1: Extract target melids
-        melids = db.get_target_melids()
-        
-        # Step 2: Process each solo
-        all_solos = []
-        for melid in melids:
-            solo_df = self._process_single_solo(db, melid)
-            all_solos.append(solo_df)
-            
-        dataset = pd.concat(all_solos, ignore_index=True)
-
-        return dataset
-
-    def _process_single_solo(self, db: WJD, melid: int) -> pd.DataFrame:
-        """
-        Process a single solo through the pipeline.
-
-        Args:
-            db (WJD): Database manager
-            melid (int): ID of the solo
+        # Step 1: Load all target solos
+        solo_data = db.load_all_solos()
+        db.close()
 
-        Returns:
-            pd.DataFrame: Processed solo data
-        """
-        # Load and flatten
-        solo_df = self._load_and_flatten_solo(db, melid)
+        # Step 2: Process all solos
+        dataset = self._flatten_solos(solo_data)
         
         # Chord processing
-        solo_df = self._align_chords(solo_df)
-        solo_df = self._fill_pickup_measures(solo_df)
+        dataset = self._align_chords(dataset)
+        dataset = self._fill_pickup_measures(dataset)
         
         # Rhythmic features
-        solo_df = self._add_rhythmic_features(solo_df)
+        dataset = self._add_rhythmic_features(dataset)
         
         # Melodic features
-        solo_df = self._add_melodic_features(solo_df)
+        dataset = self._add_melodic_features(dataset)
         
         # Harmonic features
-        solo_df = self._add_harmonic_features(solo_df)
+        dataset = self._add_harmonic_features(dataset)
         
         # Select final features
-        solo_df = self._select_final_features(solo_df)
+        dataset = self._select_final_features(dataset)
         
         # Convert to proper data types
-        solo_df = self._convert_dtypes(solo_df)
-        
-        return solo_df
+        dataset = self._convert_dtypes(dataset)
 
-    def _load_and_flatten_solo(self, db: WJD, melid: int) -> pd.DataFrame:
+        return dataset
+
+    def _flatten_solos(self, solo_data: Dict[str, pd.DataFrame]) -> pd.DataFrame:
         """
-        Load solo data and flatten into single DataFrame.
+        Flatten loaded solo data into single DataFrame.
         
         Strategy: Use beats as base (has all beat positions), then merge melody data.
         This ensures we have all beat positions, including those without melody events.
         
         Returns a DataFrame with columns:
-        - From beats: beatid, bar, beat, chord, signature, chorus_id
-        - From melody: eventid, pitch, onset, duration, tatum, division (merged on bar, beat)
-        - From solo_info: key, avgtempo, performer, style, title (broadcast to all rows)
-        """
-        solo_data = db.load_solo_data(melid)
+        - From beats: beatid, melid, bar, beat, chord, signature, chorus_id
+        - From melody: eventid, pitch, onset, duration, tatum, division (merged on melid, bar, beat)
+        - From solo_info: key, avgtempo, performer, style, title (broadcast to all rows of the solo)
 
+        Args:
+            solo_data (Dict[str, pd.DataFrame]): melody, beats, and solo_info DataFrames keyed by melid
+        """
         # Use beats as base (contains ALL beat positions)
-        df = solo_data['beats'].copy()
+        df = solo_data['beats']
 
-        # Merge melody info on bar+beat
+        # Merge melody info on melid+bar+beat
         # Use 'left' join to keep all beats, even those without melody
-        melody_subset = solo_data['melody'][['bar', 'beat', 'eventid', 'pitch', 'onset', 'duration', 'tatum', 'division', 'beatdur']].copy()
-        df = df.merge(melody_subset, on=['bar', 'beat'], how='left')
+        melody_subset = solo_data['melody'][['melid', 'bar', 'beat', 'eventid', 'pitch', 'onset', 'duration', 'tatum', 'division', 'beatdur']]
+        df = df.merge(melody_subset, on=['melid', 'bar', 'beat'], how='left')
         
         # Add solo-level metadata (broadcast to all rows)
-        for col in ['key', 'avgtempo', 'performer', 'style', 'title']:
-            df[col] = solo_data['solo_info'][col].iloc[0]
-        
-        # Add melid for reference
-        df['melid'] = melid
+        solo_info_subset = solo_data['solo_info'][['melid', 'key', 'avgtempo', 'performer', 'style', 'title']]
+        df = df.merge(solo_info_subset, on='melid', how='left')
         
         return df
 
@@ -117,33 +99,29 @@ class Preprocessor:
         Returns:
             Solo Data with chord columns added
         """
-        solo_df = solo_df.copy()
-        
-        # Parse chords - parse_chord returns dict or None
-        # Use pd.Int64Dtype() to handle None values without converting to float
-        parsed_chords = solo_df['chord'].apply(self.chord_parser.parse_chord)
-        solo_df['chord_root'] = parsed_chords.apply(lambda x: x['root'] if x else pd.NA).astype(pd.Int64Dtype())
-        solo_df['chord_quality'] = parsed_chords.apply(lambda x: x['quality'] if x else pd.NA).astype(pd.Int64Dtype())
-
-        # Align chords to melody events
-        idx_last_chord = 0
-        for idx, row in solo_df.iterrows():
-            if row['chord'] != '':
-                idx_last_chord = idx
-            solo_df.at[idx, 'chord'] = solo_df.at[idx_last_chord, 'chord']
-            solo_df.at[idx, 'chord_root'] = solo_df.at[idx_last_chord, 'chord_root']
-            solo_df.at[idx, 'chord_quality'] = solo_df.at[idx_last_chord, 'chord_quality']
+        # Align chords to melody events (carry the last chord symbol forward)
+        solo_df['chord'] = solo_df['chord'].mask(solo_df['chord'] == '').groupby(solo_df['melid']).ffill().fillna('')
+
+        # Parse chords - each distinct symbol is parsed once, then gathered by chord id
+        # Invalid chords are NaN; cast to Int64 happens once in _convert_dtypes
+        chord_ids, chord_symbols = pd.factorize(solo_df['chord'])
+        root_lut, quality_lut = self.chord_parser.build_lookup_arrays(chord_symbols)
+        solo_df['chord_root'] = root_lut[chord_ids]
+        solo_df['chord_quality'] = quality_lut[chord_ids]
 
         # Add next chord lookahead
-        cur_chord = solo_df.iloc[-1]['chord']
-        idx_next_chord = solo_df.index[-1]
-        for idx, row in solo_df.iloc[::-1].iterrows():
-            if row['chord'] != cur_chord:
-                idx_next_chord = idx+1
-                cur_chord = row['chord']
-            solo_df.at[idx, 'next_chord'] = solo_df.at[idx_next_chord, 'chord']
-            solo_df.at[idx, 'next_chord_root'] = solo_df.at[idx_next_chord, 'chord_root']
-            solo_df.at[idx, 'next_chord_quality'] = solo_df.at[idx_next_chord, 'chord_quality']
+        # Each run of identical chords within a solo is a group;
+        # the last group of each solo looks ahead to itself
+        chord_cols = ['chord', 'chord_root', 'chord_quality']
+        is_chord_change = (
+            solo_df['chord'].ne(solo_df['chord'].shift())
+            | solo_df['melid'].ne(solo_df['melid'].shift())
+        )
+        chord_group = is_chord_change.cumsum()
+        first_chords = solo_df.loc[is_chord_change, chord_cols].set_axis(chord_group[is_chord_change])
+        next_group = np.minimum(chord_group + 1, chord_group.groupby(solo_df['melid']).transform('max'))
+        next_chords = first_chords.reindex(next_group).set_axis(solo_df.index).add_prefix('next_')
+        solo_df[next_chords.columns] = next_chords
         
         return solo_df
 
@@ -158,26 +136,22 @@ class Preprocessor:
         Returns:
             Solo Data with pickup chord filled
         """
-        solo_df = solo_df.copy()
+        # Rows before the first valid chord of each solo (solos without any valid chord are skipped)
+        is_valid = (solo_df['chord'] != 'NC') & (solo_df['chord'] != '')
+        by_solo = is_valid.groupby(solo_df['melid'])
+        is_pickup = ~by_solo.cummax() & by_solo.transform('any')
 
-        # Find first valid chord
-        first_valid_idx = solo_df.index[(solo_df['chord'] != 'NC') & (solo_df['chord'] != '')].min()
-
-        if first_valid_idx is None:
+        if not is_pickup.any():
             return solo_df
 
-        # Check if there are events before the first valid chord
-        if first_valid_idx > 0:
-            first_chord_root = solo_df.at[first_valid_idx, 'chord_root']
-
-            # Calculate secondary dominant
-            dominant_root, dominant_quality = self.chord_parser.calculate_secondary_dominant(first_chord_root)
+        # Calculate secondary dominant of the first valid chord
+        first_chord_root = solo_df['chord_root'].where(is_valid).groupby(solo_df['melid']).transform('first')
+        dominant_root, dominant_quality = self.chord_parser.calculate_secondary_dominant(first_chord_root[is_pickup])
 
-            # Fill pickup measures
-            for idx in range(first_valid_idx):
-                solo_df.at[idx, 'chord_root'] = dominant_root
-                solo_df.at[idx, 'chord_quality'] = dominant_quality
-                solo_df.at[idx, 'chord'] = f"{NOTE_NAMES[dominant_root]}7"
+        # Fill pickup measures
+        solo_df.loc[is_pickup, 'chord_root'] = dominant_root
+        solo_df.loc[is_pickup, 'chord_quality'] = dominant_quality
+        solo_df.loc[is_pickup, 'chord'] = dominant_root.map(dict(enumerate(NOTE_NAMES))) + '7'
         
         return solo_df
 
@@ -193,22 +167,17 @@ class Preprocessor:
         Returns:
             Solo Data with rhythmic features added
         """
-        solo_df = solo_df.copy()
-
         # Calculate position grid
-        solo_df['pos_grid'] = solo_df.apply(
-            lambda row: self._calculate_position_grid(
-                row['beat'], row['tatum'], row['division']
-            ),
-            axis=1
+        solo_df['pos_grid'] = self._calculate_position_grid(
+            solo_df['beat'].to_numpy(dtype=np.float64, na_value=np.nan),
+            solo_df['tatum'].to_numpy(dtype=np.float64, na_value=np.nan),
+            solo_df['division'].to_numpy(dtype=np.float64, na_value=np.nan)
         )
         
         # Calculate duration grid
-        solo_df['dur_grid'] = solo_df.apply(
-            lambda row: self._calculate_duration_grid(
-                row['duration'], row['beatdur']
-            ),
-            axis=1
+        solo_df['dur_grid'] = self._calculate_duration_grid(
+            solo_df['duration'].to_numpy(dtype=np.float64, na_value=np.nan),
+            solo_df['beatdur'].to_numpy(dtype=np.float64, na_value=np.nan)
         )
 
         return solo_df
@@ -224,10 +193,8 @@ class Preprocessor:
         Returns:
             Solo Data with melodic features added
         """
-        solo_df = solo_df.copy()
-        
         # Calculate interval from previous note
-        solo_df['prev_interval'] = solo_df['pitch'].diff().fillna(0).astype(int)     
+        solo_df['prev_interval'] = solo_df.groupby('melid')['pitch'].diff().fillna(0).astype(int)     
 
         return solo_df
 
@@ -244,75 +211,72 @@ class Preprocessor:
         Returns:
             Solo Data with harmonic features added
         """
-        solo_df = solo_df.copy()
-
         # Add key center (parse the key from solo_info)
-        key_value = solo_df['key'].iloc[0] if len(solo_df) > 0 else 'C'
-        parsed_key = self.chord_parser.parse_chord(key_value)
-        solo_df['key_center'] = parsed_key['root'] if parsed_key else 0
+        key_lookup = self.chord_parser.build_lookup(solo_df['key'].unique())
+        solo_df['key_center'] = solo_df['key'].map(
+            {key: parsed[0] if parsed else 0 for key, parsed in key_lookup.items()}
+        )
 
         # Add original key shift (0)
         solo_df['key_shift'] = 0
 
-        # Calculate chord-relative pitch
-        solo_df['chord_rel_pitch'] = solo_df.apply(
-            lambda row: (row['pitch'] - row['chord_root']) % 12 
-            if pd.notna(row['chord_root']) else 0,
-            axis=1
-        )
+        # Calculate chord-relative pitch (0 without a chord root, NA for rests)
+        chord_rel_pitch = (solo_df['pitch'] - solo_df['chord_root']) % 12
+        solo_df['chord_rel_pitch'] = chord_rel_pitch.where(solo_df['chord_root'].notna(), 0)
         
         return solo_df
 
-    def _calculate_position_grid(self, beat: float, tatum: float, division: int) -> int:
+    def _calculate_position_grid(self, beat: np.ndarray, tatum: np.ndarray, division: np.ndarray) -> np.ndarray:
         """
         Calculate position in 48-grid system using WJD's structural rhythm info.
         
         Formula: Pos = (beat - 1) * 12 + Round((tatum - 1) / division * 12)
         
         Args:
-            beat: Beat number in bar (1-4 for 4/4 time)
-            tatum: Tatum number within beat (1-indexed)
-            division: Division of the beat
+            beat: Beat numbers in bar (1-4 for 4/4 time)
+            tatum: Tatum numbers within beat (1-indexed)
+            division: Divisions of the beat
         
         Returns:
-            Position in 48-grid (0-47)
+            Positions in 48-grid (0-47)
         """
 
-        beat = safe_int(beat, 1)
-        tatum = safe_int(tatum, 1)
-        division = safe_int(division, 1)
+        # Missing values default to 1 (truncated to int, like safe_int)
+        beat = np.nan_to_num(beat, nan=1).astype(np.int64)
+        tatum = np.nan_to_num(tatum, nan=1).astype(np.int64)
+        division = np.nan_to_num(division, nan=1).astype(np.int64)
         
         # Avoid division by zero
-        if division == 0:
-            division = 1
+        division = np.where(division == 0, 1, division)
         
-        # Calculate position
-        pos = (beat - 1) * GRID_PER_BEAT + round((tatum - 1) / division * GRID_PER_BEAT)
+        # Calculate position (np.rint rounds half to even, like round)
+        pos = (beat - 1) * GRID_PER_BEAT + np.rint((tatum - 1) / division * GRID_PER_BEAT).astype(np.int64)
         
         # Clip to valid range
-        pos = int(clip_to_range(pos, 0, GRID_PER_BAR - 1))
+        pos = np.clip(pos, 0, GRID_PER_BAR - 1)
         
         return pos
 
-    def _calculate_duration_grid(self, duration_sec: float, beatdur_sec: float) -> int:
+    def _calculate_duration_grid(self, duration_sec: np.ndarray, beatdur_sec: np.ndarray) -> np.ndarray:
         """
-        Convert duration from seconds to 12-grid units.
+        Convert durations from seconds to 12-grid units.
         
         Args:
-            duration_sec: Duration in seconds
-            beatdur_sec: Duration of one beat in seconds
+            duration_sec: Durations in seconds
+            beatdur_sec: Durations of one beat in seconds
         
         Returns:
-            Duration in grid units (clipped to max 48)
+            Durations in grid units (clipped to max 48)
         """
-        if pd.isna(duration_sec) or pd.isna(beatdur_sec) or beatdur_sec == 0:
-            return 1  # Default to minimum duration
+        # Default to minimum duration where either value is missing or beat duration is 0
+        invalid = np.isnan(duration_sec) | np.isnan(beatdur_sec) | (beatdur_sec == 0)
+        safe_beatdur = np.where(invalid, 1.0, beatdur_sec)
         
         # Convert to grid units
-        dur_grid = round(safe_divide(duration_sec, beatdur_sec, 1.0) * GRID_PER_BEAT)
+        dur_grid = np.rint(np.where(invalid, 0.0, duration_sec) / safe_beatdur * GRID_PER_BEAT).astype(np.int64)
         
         # Clip to valid range (minimum 1, maximum 48)
-        dur_grid = int(clip_to_range(dur_grid, 1, GRID_PER_BAR))
+        dur_grid = np.clip(dur_grid, 1, GRID_PER_BAR)
         
         return dur_grid
     
@@ -347,7 +311,7 @@ class Preprocessor:
         
         # Only select columns that exist
         existing_cols = [col for col in feature_cols if col in solo_df.columns]
-        return solo_df[existing_cols].copy()
+        return solo_df[existing_cols]
     
     def _convert_dtypes(self, solo_df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -356,7 +320,7 @@ class Preprocessor:
         Data type strategy:
         - IDs and categorical integers: Int64 (nullable integer)
         - Continuous numeric values: float64
-        - Text fields: string
+        - Text fields: category (low-cardinality, shared across all solos)
         
         Args:
             solo_df (pd.DataFrame): DataFrame with features
@@ -364,8 +328,6 @@ class Preprocessor:
         Returns:
             pd.DataFrame: DataFrame with proper dtypes
         """
-        solo_df = solo_df.copy()
-        
         # Integer columns (nullable - can have NA values)
         int_cols = [
             'melid', 'eventid', 'beatid',           # IDs
@@ -379,10 +341,6 @@ class Preprocessor:
             'key_center', 'key_shift'               # Key info
         ]
         
-        for col in int_cols:
-            if col in solo_df.columns:
-                solo_df[col] = solo_df[col].astype(pd.Int64Dtype())
-        
         # Float columns (continuous values)
         float_cols = [
             'onset', 'duration',  # Time values in seconds
@@ -390,24 +348,27 @@ class Preprocessor:
             'beatdur'             # Beat duration in seconds
         ]
         
-        for col in float_cols:
-            if col in solo_df.columns:
-                solo_df[col] = solo_df[col].astype('float64')
-        
-        # String columns (text data)
-        string_cols = [
+        # Categorical columns (low-cardinality text data)
+        category_cols = [
             'chord', 'next_chord',  # Chord symbols
             'key',                   # Key signature
             'performer', 'style', 'title',  # Metadata
             'signature'              # Time signature
         ]
+
+        # Convert all columns in a single pass
+        type_map = {
+            **{col: pd.Int64Dtype() for col in int_cols if col in solo_df.columns},
+            **{col: 'float64' for col in float_cols if col in solo_df.columns},
+            **{col: 'category' for col in category_cols if col in solo_df.columns},
+        }
+
+        # Share one vocabulary between chord and next_chord so their codes match
+        if 'chord' in solo_df.columns and 'next_chord' in solo_df.columns:
+            chord_vocab = pd.concat([solo_df['chord'], solo_df['next_chord']]).dropna().unique()
+            type_map['chord'] = type_map['next_chord'] = pd.CategoricalDtype(sorted(chord_vocab))
         
-        for col in string_cols:
-            if col in solo_df.columns:
-                # Convert to string type (pandas string dtype, not object)
-                solo_df[col] = solo_df[col].astype('string')
-        
-        return solo_df
+        return solo_df.astype(type_map)
 
         
 if __name__ == "__main__":
@@ -420,11 +381,16 @@ if __name__ == "__main__":
     preprocessor = Preprocessor(db_path=DB_PATH)
     processed_df = preprocessor.process()
 
-    # Save output
-    processed_df.to_pickle(OUTPUT_PKL)
-    processed_df.to_csv(OUTPUT_CSV, index=False)
+    # Save output (CSV formatting is CPU-bound, so write parquet alongside it)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        parquet_write = executor.submit(
+            processed_df.to_parquet, OUTPUT_PARQUET, engine='pyarrow', compression='zstd', index=False
+        )
+        csv_write = executor.submit(processed_df.to_csv, OUTPUT_CSV, index=False)
+        parquet_write.result()
+        csv_write.result()
     
     print(f"✅ Preprocessing complete!")
     print(f"   - Processed {len(processed_df)} rows")
-    print(f"   - Saved to {OUTPUT_PKL}")
+    print(f"   - Saved to {OUTPUT_PARQUET}")
     print(f"   - Saved to {OUTPUT_CSV}")
\ No newline at end of file
@@ -8,6 +8,15 @@ import pandas as pd
 from typing import Union, Any
 
 
+def _is_missing(value: Any) -> bool:
+    """
+    Check if a scalar is None, NaN or pd.NA.
+
+    Cheaper than pd.isna for scalars: NaN is detected by self-inequality.
+    """
+    return value is None or value is pd.NA or value != value
+
+
 def safe_int(value: Any, default: int = 0) -> int:
     """
     Safely convert value to int, return default if conversion fails.
@@ -27,7 +36,7 @@ def safe_int(value: Any, default: int = 0) -> int:
         >>> safe_int("invalid", default=-1)
         -1
     """
-    if pd.isna(value):
+    if _is_missing(value):
         return default
     try:
         return int(value)
@@ -55,7 +64,7 @@ def safe_divide(numerator: float, denominator: float, default: float = 0.0) -> f
         >>> safe_divide(None, 5, default=1.0)
         1.0
     """
-    if denominator == 0 or pd.isna(numerator) or pd.isna(denominator):
+    if _is_missing(numerator) or _is_missing(denominator) or denominator == 0:
         return default
     return numerator / denominator
 